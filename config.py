@@ -7,20 +7,45 @@ from dotenv import load_dotenv
 class CrawlerConfig:
     CRAWL_DELAY = 1000  # in milliseconds
     MAX_PAGES = 50  # As per project guidelines
+    CONCURRENCY = 4  # concurrent workers, politeness delay still applies per host
     USER_AGENT = "KonduitCrawler/1.0"
 
 
 # DEFAULT INDEXER SETTINGS
 class IndexerConfig:
-    CHUNK_SIZE = 800  # choosing initial lower chunk size as per project guidelines
+    # In tokens: all-MiniLM-L6-v2 reads 256 tokens including [CLS]/[SEP], so longer
+    # chunks would be silently truncated by the embedder
+    CHUNK_SIZE = 254
     CHUNK_OVERLAP = 0.125  # 12.5% overlap initially
     VECTOR_STORE_LOC = "data/vector"
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    TOKENIZER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # measures chunk length
+    EMBEDDING_BATCH_SIZE = 128  # chunks per encode() batch
+    CHUNK_POOL_MIN_DOCS = 32  # fewer changed pages are chunked in-process
+    DEDUP_THRESHOLD = 0.95  # Jaccard similarity above which a page is a duplicate
+    DEDUP_NUM_PERM = 64  # MinHash permutations per page
+    # FAISS copy of the embeddings inside the vector store dir, searched by the QA engine
+    FAISS_INDEX_FILE = "faiss.index"
+    FAISS_IDS_FILE = "faiss_ids.npy"  # chunk id of each FAISS row
+    FAISS_IVFPQ_MIN_VECTORS = 10_000  # smaller stores use an exact 8-bit scalar quantized index
 
 
 # Q&A Settings
 class QaConfig:
     TOP_CHUNKS = 6
+    EVAL_CONCURRENCY = 8  # eval_cli queries in flight, keep under the API rate limit
+    # IVF lists probed per query on IVF-PQ indexes, per profile. Only stores of at
+    # least IndexerConfig.FAISS_IVFPQ_MIN_VECTORS chunks get one, smaller ones are exact
+    IVF_NPROBE_PROFILES = {"fast": 4, "balanced": 16, "recall-max": 64}
+    IVF_NPROBE_PROFILE = "balanced"
+    SEMANTIC_CACHE_SIZE = 256  # answered questions kept for reuse, 0 disables the cache
+    SEMANTIC_CACHE_THRESHOLD = 0.97  # cosine similarity for a question to count as a repeat
+    QUERY_EMBEDDING_CACHE_SIZE = 4096  # question embeddings kept in memory
+    QUERY_EMBEDDING_BATCH_SIZE = 64  # questions per encoder forward pass
+    SOURCE_SNIPPET_CHARS = 512  # characters of each retrieved chunk returned as its snippet
+    RETRIEVAL_CACHE_SIZE = 1024  # questions whose retrieved chunks are kept in memory
+    # Grade answers with a second, independent LLM call instead of in the answer call
+    SEPARATE_EVALUATION = False
 
 
 class Env:
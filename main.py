@@ -1,14 +1,19 @@
 import argparse
+import asyncio
+import atexit
 import json
 import logging
 import os
+import queue
 import sys
 import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from urllib.parse import urlparse
 
 import config
 import numpy as np
+import orjson
 from src.crawler import PoliteCrawler
 from src.indexer import Indexer
 from src.qa_engine import QAEngine
@@ -24,12 +29,25 @@ formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 # Create a file handler to save logs to a file
 file_handler = logging.FileHandler("cli.log", mode="a")
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 
 # Create a stream handler to display logs in the console
 stream_handler = logging.StreamHandler(sys.stdout)
 stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
+
+# Hand records to a background listener thread so the crawl/eval loops never
+# block on log writes. Handlers installed by the src modules' basicConfig move
+# behind the queue too, the listener is stopped (and flushed) on exit.
+log_queue = queue.Queue(-1)
+listener = QueueListener(
+    log_queue,
+    *logger.handlers,
+    file_handler,
+    stream_handler,
+    respect_handler_level=True,
+)
+logger.handlers = [QueueHandler(log_queue)]
+listener.start()
+atexit.register(listener.stop)
 
 
 def get_domain_dir_name(url: str) -> str:
@@ -47,24 +65,45 @@ def setup_directories(base_path: str):
 
 
 def save_results(filepath: str, command: str, data: dict):
-    """Saves the results of a command to a JSON file, appending new results."""
+    """Appends the results of a command as one JSON line to a JSONL log."""
     logging.info(f"Saving results for '{command}' command to {filepath}")
 
     timestamp = datetime.now().isoformat()
-    new_entry = {command: data}
+    new_entry = {"timestamp": timestamp, "command": command, "data": data}
+
+    # Append-only, so earlier runs are never re-read or re-encoded.
+    # numpy scalars come from eval_cli stats
+    with open(filepath, "ab") as f:
+        f.write(
+            orjson.dumps(
+                new_entry,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY,
+            )
+        )
 
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing_data = {}
 
-    if "runs" not in existing_data:
-        existing_data["runs"] = []
-    existing_data["runs"].append({timestamp: new_entry})
+async def stream_answer(engine: QAEngine, question: str) -> dict:
+    """Prints the answer to stdout as it is generated and returns the full response."""
+    async for part in engine.aanswer_question_stream(question):
+        if isinstance(part, dict):
+            print()
+            return part
+        print(part, end="", flush=True)
+
+
+async def answer_concurrently(engine: QAEngine, questions: list, concurrency: int) -> list:
+    """
+    Answers all questions with at most `concurrency` in flight at once,
+    returning the responses in the same order as the questions.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer_one(question: str) -> dict:
+        async with semaphore:
+            # eval_cli only reports answers, timings and token usage
+            return await engine.aanswer_question(question, include_sources=False)
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, indent=2, ensure_ascii=False)
+    return await asyncio.gather(*(answer_one(question) for question in questions))
 
 
 if __name__ == "__main__":
@@ -97,6 +136,13 @@ if __name__ == "__main__":
         help="The number of milliseconds to wait for before the next request",
         default=config.CrawlerConfig.CRAWL_DELAY,
     )
+    crawler_parse.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        help="The number of pages fetched and parsed concurrently",
+        default=config.CrawlerConfig.CONCURRENCY,
+    )
 
     # === Indexer Arguments ===
     index_parse = subparser.add_parser(
@@ -110,7 +156,7 @@ if __name__ == "__main__":
         dest="chunk_size",
         type=int,
         default=config.IndexerConfig.CHUNK_SIZE,
-        help="The size length of text chunks",
+        help="The size of text chunks, in embedding-model tokens",
     )
     index_parse.add_argument(
         "--chunk-overlap",
@@ -144,6 +190,23 @@ if __name__ == "__main__":
         action="store_true",
         help="Summarize the source snippets for a more compact output.",
     )
+    ask_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the answer as it is generated, before the full JSON response.",
+    )
+    ask_parser.add_argument(
+        "--nprobe-profile",
+        dest="nprobe_profile",
+        choices=config.QaConfig.IVF_NPROBE_PROFILES,
+        default=config.QaConfig.IVF_NPROBE_PROFILE,
+        help=(
+            "How many IVF-PQ lists are probed per query, trading retrieval recall for"
+            " latency. Has no effect below "
+            f"{config.IndexerConfig.FAISS_IVFPQ_MIN_VECTORS:,} chunks, where the index"
+            " is searched exactly"
+        ),
+    )
 
     # === Evaluation Command ===
     eval_parser = subparser.add_parser(
@@ -169,6 +232,25 @@ if __name__ == "__main__":
         default=config.QaConfig.TOP_CHUNKS,
         help="Number of chunks to retrieve for context during evaluation.",
     )
+    eval_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        default=config.QaConfig.EVAL_CONCURRENCY,
+        help="The number of queries answered concurrently.",
+    )
+    eval_parser.add_argument(
+        "--nprobe-profile",
+        dest="nprobe_profile",
+        choices=config.QaConfig.IVF_NPROBE_PROFILES,
+        default=config.QaConfig.IVF_NPROBE_PROFILE,
+        help=(
+            "How many IVF-PQ lists are probed per query, trading retrieval recall for"
+            " latency. Has no effect below "
+            f"{config.IndexerConfig.FAISS_IVFPQ_MIN_VECTORS:,} chunks, where the index"
+            " is searched exactly"
+        ),
+    )
 
     args = parser.parse_args()
 
@@ -176,7 +258,7 @@ if __name__ == "__main__":
     context_base_path = os.path.join("./data", domain_dir_name)
     crawled_output_path = os.path.join(context_base_path, "crawled_content.json")
     vector_store_path = os.path.join(context_base_path, "vector_store")
-    results_path = os.path.join(context_base_path, "results.json")
+    results_path = os.path.join(context_base_path, "results.jsonl")
 
     setup_directories(context_base_path)
 
@@ -190,10 +272,12 @@ if __name__ == "__main__":
                 start_url=args.start_url,
                 max_pages=args.max_pages,
                 delay_ms=args.politeness,
+                concurrency=args.concurrency,
+                user_agent=config.CrawlerConfig.USER_AGENT,
             )
-            crawled_data = crawl.run()
-            with open(crawled_output_path, "w", encoding="utf-8") as f:
-                json.dump(crawled_data, f, indent=2, ensure_ascii=False)
+            crawled_data = asyncio.run(crawl.run())
+            with open(crawled_output_path, "wb") as f:
+                f.write(orjson.dumps(crawled_data, option=orjson.OPT_INDENT_2))
             logging.info(
                 f"Successfully Crawled Data, Output saved to {crawled_output_path}"
             )
@@ -231,8 +315,15 @@ if __name__ == "__main__":
             logging.info(
                 f"\nProcessing Query\nContext URL: {args.start_url}\nQuery: {args.question}"
             )
-            engine = QAEngine(vector_store_path=vector_store_path, top_k=args.top_k)
-            response_json = engine.answer_question(args.question)
+            engine = QAEngine(
+                vector_store_path=vector_store_path,
+                top_k=args.top_k,
+                nprobe_profile=args.nprobe_profile,
+            )
+            if args.stream:
+                response_json = asyncio.run(stream_answer(engine, args.question))
+            else:
+                response_json = engine.answer_question(args.question)
             
             result_data = response_json
 
@@ -254,15 +345,21 @@ if __name__ == "__main__":
                 questions = json.load(f)
 
             logging.info(f"Evaluating RAG crawler with {len(questions)} queries")
-            engine = QAEngine(vector_store_path=vector_store_path, top_k=args.top_k)
+            engine = QAEngine(
+                vector_store_path=vector_store_path,
+                top_k=args.top_k,
+                nprobe_profile=args.nprobe_profile,
+            )
             
             latencies = []
             total_input_tokens = 0
             total_output_tokens = 0
             total_tokens_used = 0
             
-            for question in questions:
-                response = engine.answer_question(question)
+            responses = asyncio.run(
+                answer_concurrently(engine, questions, args.concurrency)
+            )
+            for question, response in zip(questions, responses):
                 latencies.append(response["timings"]["total_ms"])
                 if response.get("usage"):
                     total_input_tokens += response["usage"].get("prompt_token_count", 0)
@@ -275,12 +372,14 @@ if __name__ == "__main__":
                     f"Time Taken: {response['timings']['total_ms']} ms"
                 )
             
-            p50_latency = np.percentile(latencies, 50)
-            p95_latency = np.percentile(latencies, 95)
+            # Convert once, both percentiles come from a single sort
+            latency_array = np.asarray(latencies, dtype=np.float64)
+            p50_latency, p95_latency = np.percentile(latency_array, [50, 95])
+            mean_latency = latency_array.mean()
             
             logging.info("--- Evaluation Complete ---")
             logging.info(f"Total Queries: {len(latencies)}")
-            logging.info(f"Average Latency: {np.mean(latencies):.2f} ms")
+            logging.info(f"Average Latency: {mean_latency:.2f} ms")
             logging.info(f"p50 (Median) Latency: {p50_latency:.2f} ms")
             logging.info(f"p95 Latency: {p95_latency:.2f} ms")
             logging.info("--- Token Usage ---")
@@ -291,7 +390,7 @@ if __name__ == "__main__":
             result_data = {
                 "status": "Success",
                 "total_queries": len(latencies),
-                "average_latency_ms": np.mean(latencies),
+                "average_latency_ms": mean_latency,
                 "p50_latency_ms": p50_latency,
                 "p95_latency_ms": p95_latency,
                 "total_tokens_used": total_tokens_used,
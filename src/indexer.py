@@ -1,13 +1,25 @@
+import functools
+import itertools
 import json
 import logging
+import mmap
+import multiprocessing
 import os
+import tempfile
 import time
 
 import config
+import faiss
+import numpy as np
+import orjson
+import xxhash
+from chromadb.utils.batch_utils import create_batches
+from datasketch import MinHash, MinHashLSH
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain_community.vectorstores.chroma import Chroma
+from tokenizers import Tokenizer
 
 logging.basicConfig(
     filename="rag_indexer.log",
@@ -17,6 +29,79 @@ logging.basicConfig(
 )
 
 
+def build_faiss_index(vectors: np.ndarray) -> faiss.Index:
+    """
+    Inner-product index over the normalized chunk vectors. Small stores get an
+    8-bit scalar quantized flat index (an exact scan over one byte per dimension),
+    large ones an IVF-PQ index with an HNSW coarse quantizer, sqrt(N) lists and
+    8-bit codes for every d/8-wide sub-vector.
+    """
+    n, d = vectors.shape
+    if n < config.IndexerConfig.FAISS_IVFPQ_MIN_VECTORS:
+        index = faiss.IndexScalarQuantizer(
+            d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+    else:
+        nlist = int(np.sqrt(n))
+        # PQ needs d to split evenly into sub-vectors, aim for 8 dimensions each
+        m = next(m for m in range(max(1, d // 8), 0, -1) if d % m == 0)
+        quantizer = faiss.IndexHNSWFlat(d, 32, faiss.METRIC_INNER_PRODUCT)
+        index = faiss.IndexIVFPQ(
+            quantizer, d, nlist, m, 8, faiss.METRIC_INNER_PRODUCT
+        )
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def _get_tokenizer() -> Tokenizer:
+    """The embedding model's (Rust) tokenizer, loaded once per process."""
+    tokenizer = Tokenizer.from_pretrained(config.IndexerConfig.TOKENIZER_MODEL)
+    # The model's tokenizer.json truncates, which would under-count long splits
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def _token_length(text: str) -> int:
+    """Length of a text in embedding-model tokens, excluding [CLS]/[SEP]."""
+    return len(_get_tokenizer().encode(text, add_special_tokens=False).ids)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_text_splitter(
+    chunk_size: int, chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
+    """One splitter per settings per process, built on first use."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=_token_length,
+    )
+
+
+def _chunk_doc(args: tuple[str, dict, int, int]) -> list[Document]:
+    """
+    Splits one page into chunk Documents. Module level so Pool workers can pickle it.
+    """
+    page_content, metadata, chunk_size, chunk_overlap = args
+    splitter = _get_text_splitter(chunk_size, chunk_overlap)
+    # split_text per page skips split_documents' per-chunk metadata deepcopy
+    return [
+        Document(page_content=chunk, metadata={"source_url": metadata["source_url"]})
+        for chunk in splitter.split_text(page_content)
+    ]
+
+
+def _shingles(text: str, k: int = 5) -> list[str]:
+    """Returns the k-word shingles of a text, taken with a sliding window."""
+    words = text.split()
+    if len(words) <= k:
+        return [" ".join(words)]
+    return [" ".join(words[i : i + k]) for i in range(len(words) - k + 1)]
+
+
 class Indexer:
     """
     Initializes the indexer, which embeds content crawled from a URL
@@ -34,6 +119,7 @@ class Indexer:
         self.chunk_overlap_ratio = chunk_overlap if 0 < chunk_overlap < 1 else 0.125
         self.input_file = input_file
         self.vector_store_path = vector_store_path
+        self.manifest_path = os.path.join(vector_store_path, "manifest.json")
 
         logging.info(f"Loading Embedding Model: {config.IndexerConfig.EMBEDDING_MODEL}")
         self.embedding_function = SentenceTransformerEmbeddings(
@@ -41,11 +127,8 @@ class Indexer:
         )
 
         logging.info("Initializing Text Splitter")
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=int(self.chunk_overlap_ratio * self.chunk_size),
-            length_function=len,
-        )
+        self.chunk_overlap = int(self.chunk_overlap_ratio * self.chunk_size)
+        self.text_splitter = _get_text_splitter(self.chunk_size, self.chunk_overlap)
 
     def _load_data(self) -> list[Document]:
         """
@@ -53,8 +136,11 @@ class Indexer:
         """
         data = {}
         try:
-            with open(self.input_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            # orjson parses straight out of the mapped file, without a read() copy
+            with open(self.input_file, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped, memoryview(mapped) as view:
+                data = orjson.loads(view)
         except FileNotFoundError:
             logging.error(
                 f"Input File Not Found At Provided Location: {self.input_file}, Run crawler before indexing"
@@ -69,10 +155,93 @@ class Indexer:
         logging.info(f"Loaded {len(documents)} documents from {self.input_file}")
         return documents
 
+    def _save_faiss_index(self, vector_store: Chroma) -> None:
+        """
+        Rebuilds the FAISS index the QA engine searches from every stored embedding,
+        along with the chunk id of each row. Chroma keeps the text and metadata.
+        """
+        index_path = os.path.join(
+            self.vector_store_path, config.IndexerConfig.FAISS_INDEX_FILE
+        )
+        ids_path = os.path.join(
+            self.vector_store_path, config.IndexerConfig.FAISS_IDS_FILE
+        )
+        stored = vector_store._collection.get(include=["embeddings"])
+        if not stored["ids"]:
+            logging.warning("Vector store is empty, no FAISS index written.")
+            for path in (index_path, ids_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        index = build_faiss_index(np.asarray(stored["embeddings"], dtype=np.float32))
+        faiss.write_index(index, index_path)
+        np.save(ids_path, np.asarray(stored["ids"]))
+        logging.info(
+            f"Saved a {type(index).__name__} over {index.ntotal} embeddings to {index_path}"
+        )
+
+    def _drop_near_duplicates(self, documents: list[Document]) -> list[Document]:
+        """
+        Drops pages whose 5-shingle Jaccard similarity to an earlier page is above
+        the configured threshold (e.g. pages differing only by a sidebar).
+        """
+        num_perm = config.IndexerConfig.DEDUP_NUM_PERM
+        lsh = MinHashLSH(threshold=config.IndexerConfig.DEDUP_THRESHOLD, num_perm=num_perm)
+        unique_documents = []
+        for doc in documents:
+            minhash = MinHash(num_perm=num_perm)
+            minhash.update_batch(
+                [shingle.encode("utf-8") for shingle in _shingles(doc.page_content)]
+            )
+            if lsh.query(minhash):
+                continue
+            lsh.insert(doc.metadata["source_url"], minhash)
+            unique_documents.append(doc)
+
+        logging.info(
+            f"Dropped {len(documents) - len(unique_documents)} near-duplicate documents."
+        )
+        return unique_documents
+
+    def _settings(self) -> dict:
+        """Everything besides page text that decides a page's chunks and vectors."""
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "embedding_model": config.IndexerConfig.EMBEDDING_MODEL,
+            "tokenizer": config.IndexerConfig.TOKENIZER_MODEL,
+        }
+
+    def _open_vector_store(self) -> Chroma:
+        """Opens the store's collection, creating it if needed."""
+        return Chroma(
+            persist_directory=self.vector_store_path,
+            embedding_function=self.embedding_function,
+        )
+
+    def _load_manifest(self) -> dict:
+        """
+        Loads the {source_url: {hash, chunk_ids}} record of the last indexing run.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"settings": None, "pages": {}}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        """Writes the manifest to a temp file and renames it into place."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.vector_store_path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
     def create_index(self) -> None:
         """
         Orchestrates loading, chunking, embedding, and storage of provided data,
-        with performance logging and progress indication.
+        with performance logging and progress indication. Pages whose text is
+        unchanged since the last run keep their stored chunks and are skipped.
         """
         start_time = time.time()
 
@@ -80,23 +249,118 @@ class Indexer:
         if not documents:
             logging.warning("Documents list is empty. Aborting indexing.")
             return
+        # Dropped duplicates count as removed pages, so their old chunks are deleted too
+        documents = self._drop_near_duplicates(documents)
+
+        manifest = self._load_manifest()
+        previous_pages = manifest["pages"]
+        settings = self._settings()
+        rebuild = manifest["settings"] != settings
+        if rebuild:
+            # Chunking or model settings changed, every stored chunk is out of date
+            reusable_pages = {}
+        else:
+            reusable_pages = previous_pages
 
-        logging.info(f"Chunking {len(documents)} documents...")
-        chunks = self.text_splitter.split_documents(documents)
-        logging.info(f"Created {len(chunks)} chunks from {len(documents)} documents.")
+        pages = {}
+        unchanged_urls = set()
+        changed_documents = []
+        for doc in documents:
+            source_url = doc.metadata["source_url"]
+            content_hash = xxhash.xxh3_64_hexdigest(doc.page_content.encode("utf-8"))
+            previous = reusable_pages.get(source_url)
+            if previous and previous["hash"] == content_hash:
+                pages[source_url] = previous
+                unchanged_urls.add(source_url)
+            else:
+                pages[source_url] = {"hash": content_hash, "chunk_ids": []}
+                changed_documents.append(doc)
 
+        # Chunks of changed or removed pages, replaced below or dropped entirely
+        stale_ids = [
+            chunk_id
+            for source_url, page in previous_pages.items()
+            if source_url not in unchanged_urls
+            for chunk_id in page["chunk_ids"]
+        ]
         logging.info(
-            f"Creating vector store at: {self.vector_store_path}. This may take a while..."
+            f"{len(changed_documents)} of {len(documents)} documents are new or changed, "
+            f"{len(stale_ids)} stale chunks to remove."
         )
 
-        # Use a generator with tqdm to show progress for the embedding process
+        logging.info(f"Chunking {len(changed_documents)} documents...")
+        jobs = [
+            (doc.page_content, doc.metadata, self.chunk_size, self.chunk_overlap)
+            for doc in changed_documents
+        ]
+        # Chunking is pure-Python CPU work, so large batches are split across
+        # processes. Each result is one page's chunks, so pages stay contiguous.
+        if len(jobs) >= config.IndexerConfig.CHUNK_POOL_MIN_DOCS:
+            with multiprocessing.Pool() as pool:
+                chunks = list(
+                    itertools.chain.from_iterable(
+                        pool.imap_unordered(_chunk_doc, jobs, chunksize=4)
+                    )
+                )
+        else:
+            chunks = list(itertools.chain.from_iterable(map(_chunk_doc, jobs)))
+        logging.info(
+            f"Created {len(chunks)} chunks from {len(changed_documents)} documents."
+        )
 
-        vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embedding_function,
-            persist_directory=self.vector_store_path,
+        logging.info(
+            f"Updating vector store at: {self.vector_store_path}. This may take a while..."
         )
 
+        texts = [chunk.page_content for chunk in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+        # Stable "<url>#<n>" ids, so re-indexing overwrites chunks instead of duplicating them
+        ids = []
+        for source_url, group in itertools.groupby(
+            chunks, key=lambda chunk: chunk.metadata["source_url"]
+        ):
+            chunk_ids = [f"{source_url}#{i}" for i, _ in enumerate(group)]
+            pages[source_url]["chunk_ids"] = chunk_ids
+            ids.extend(chunk_ids)
+
+        vector_store = self._open_vector_store()
+        if rebuild:
+            # Chunking or model settings changed, so no stored chunk is reusable
+            vector_store.delete_collection()
+            vector_store = self._open_vector_store()
+        elif stale_ids:
+            for batch in create_batches(api=vector_store._client, ids=stale_ids):
+                vector_store._collection.delete(ids=batch[0])
+
+        if texts:
+            # Encode everything in large batches on the already loaded SentenceTransformer
+            # (tqdm progress bar included), rather than letting Chroma drive small ones
+            batch_size = config.IndexerConfig.EMBEDDING_BATCH_SIZE
+            logging.info(f"Embedding {len(texts)} chunks in batches of {batch_size}...")
+            vectors = self.embedding_function.client.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=True,
+                normalize_embeddings=True,
+            )
+
+            for batch_ids, batch_vectors, batch_metadatas, batch_texts in create_batches(
+                api=vector_store._client,
+                ids=ids,
+                embeddings=vectors.tolist(),
+                metadatas=metadatas,
+                documents=texts,
+            ):
+                vector_store._collection.upsert(
+                    ids=batch_ids,
+                    embeddings=batch_vectors,
+                    metadatas=batch_metadatas,
+                    documents=batch_texts,
+                )
+        self._save_faiss_index(vector_store)
+        self._save_manifest({"settings": settings, "pages": pages})
+
         end_time = time.time()
         duration = end_time - start_time
 